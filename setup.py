@@ -29,8 +29,19 @@ setup(
     python_requires=">=3.8",
     install_requires=[
         "requests>=2.31.0",
+        "urllib3>=1.26.0",
     ],
     extras_require={
+        "fast": [
+            "orjson>=3.8.0",
+            "brotli>=1.0.9",
+        ],
+        "async": [
+            "httpx[http2]>=0.24.0",
+        ],
+        "stream": [
+            "ijson>=3.1",
+        ],
         "dev": [
             "pytest>=7.4.0",
             "pytest-cov>=4.1.0",
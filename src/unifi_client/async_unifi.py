@@ -0,0 +1,309 @@
+import asyncio
+import logging
+from datetime import timedelta
+from time import monotonic
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Mapping,
+    Optional,
+    Set,
+)
+
+import httpx
+
+from unifi_client.unifi import (
+    _API_ROOT,
+    _AUTH_RETRY_MIN_SESSION_AGE,
+    UniFiApiError,
+    _ETagCache,
+    _UniFiEndpoints,
+    _json_loads,
+    _short_body,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncUniFiApiClient(
+    _UniFiEndpoints[Awaitable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]]
+):
+    """
+    Asyncio client for the UniFi Site Manager API built on httpx.
+
+    Exposes the same endpoint methods as UniFiApiClient; each one validates its
+    arguments immediately and returns an awaitable of the parsed response, so
+    many calls can be fanned out with asyncio.gather over one HTTP/2
+    connection pool.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_version: str = "v1",
+        timeout: int = 30,
+        session_ttl_minutes: int = 55,
+        max_connections: int = 50,
+        etag_cache_size: int = 128,
+    ) -> None:
+        if not api_key:
+            raise ValueError("API key cannot be empty")
+
+        self.api_key = api_key
+        self.api_version = api_version
+        self.base_url = f"{_API_ROOT}/{self.api_version}"
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.session_ttl = timedelta(minutes=session_ttl_minutes)
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_created_at: float = 0.0
+        # TTL clock; renewing an expired client resets this but keeps its pool
+        self._client_renewed_at: float = 0.0
+        # Created lazily so the lock binds to the loop that actually uses it
+        self._lock: Optional[asyncio.Lock] = None
+        # Requests awaiting a response, per client; a replaced client is only
+        # closed once its count drops to zero
+        self._in_flight: Dict[httpx.AsyncClient, int] = {}
+        self._retired: Set[httpx.AsyncClient] = set()
+        self._etag_cache = _ETagCache(etag_cache_size) if etag_cache_size > 0 else None
+        self._default_headers = {
+            "Accept": "application/json",
+            "X-API-Key": self.api_key,
+            "User-Agent": "UniFiApiClient/1.0",
+        }
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create the underlying httpx client with automatic refresh"""
+        client = self._client
+        if (
+            client is not None
+            and monotonic() - self._client_renewed_at <= self._session_ttl_seconds
+        ):
+            return client
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            now = monotonic()
+
+            if self._client is None:
+                self._client = self._create_client()
+                self._client_created_at = now
+                self._client_renewed_at = now
+                logger.debug("New session created")
+            elif now - self._client_renewed_at > self._session_ttl_seconds:
+                logger.info("Session expired, renewing session state")
+                self._client.cookies.clear()
+                self._client.headers.update(self._default_headers)
+                self._client_renewed_at = now
+
+            return self._client
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """Create a new configured httpx client"""
+        return httpx.AsyncClient(
+            http2=True,
+            headers=self._default_headers,
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=20,
+            ),
+            timeout=self.timeout,
+        )
+
+    async def refresh_session(self) -> None:
+        """
+        Manually force session refresh.
+
+        Requests already in flight finish on the old client, which is closed
+        once the last of them completes.
+        """
+        client = self._client
+        self._client = None
+        self._client_created_at = 0.0
+        if client is not None:
+            await self._retire_client(client)
+        logger.info("Session manually refreshed")
+
+    async def _retire_client(self, client: httpx.AsyncClient) -> None:
+        """Close a replaced client now, or after its in-flight requests finish"""
+        if self._in_flight.get(client):
+            self._retired.add(client)
+        else:
+            await client.aclose()
+
+    async def _release_client(self, client: httpx.AsyncClient) -> None:
+        """Mark one request on client as done, closing the client if retired"""
+        remaining = self._in_flight[client] - 1
+        if remaining:
+            self._in_flight[client] = remaining
+            return
+        del self._in_flight[client]
+        if client in self._retired:
+            self._retired.discard(client)
+            await client.aclose()
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Mapping[str, Any]] = None,
+        cacheable: bool = False,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Centralized request handler with automatic retry on auth failures.
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            endpoint: API endpoint path (without base URL)
+            params: Query parameters
+            cacheable: Revalidate the response through the ETag cache
+            **kwargs: Additional arguments to pass to httpx
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            UniFiApiError: If the API request fails
+        """
+        url = self._url(endpoint)
+
+        # Age the failure against the client that sent the request; by the
+        # time it arrives another call may already have replaced it
+        client = await self._get_client()
+        created_at = self._client_created_at
+        try:
+            return await self._send(method, url, params, kwargs, cacheable)
+
+        except httpx.HTTPStatusError as e:
+            # Retry once on auth errors, unless the session was just created
+            session_age = monotonic() - created_at
+            if (
+                e.response.status_code in (401, 403)
+                and session_age > _AUTH_RETRY_MIN_SESSION_AGE
+            ):
+                logger.warning("Authentication error (HTTP %s), refreshing session", e.response.status_code)
+                if self._client is client:
+                    await self.refresh_session()
+                try:
+                    return await self._send(method, url, params, kwargs, cacheable)
+                except httpx.HTTPStatusError as retry_error:
+                    logger.error(
+                        "Retry failed: %s - %s",
+                        retry_error.response.status_code,
+                        _short_body(retry_error.response)
+                    )
+                    raise UniFiApiError("API request failed after retry: %s", retry_error.response.status_code) from retry_error
+
+            logger.error("HTTP error: %s - %s", e.response.status_code, _short_body(e.response))
+            raise UniFiApiError("API request failed: %s", e.response.status_code) from e
+
+        except httpx.TimeoutException:
+            logger.error("Request timed out after %s seconds", self.timeout)
+            raise UniFiApiError("Request timed out after %s seconds", self.timeout)
+
+        except httpx.HTTPError as e:
+            logger.error("Request failed: %s", e)
+            raise UniFiApiError("Request failed: %s", e) from e
+
+        except ValueError as e:
+            logger.error("Invalid JSON response: %s", e)
+            raise UniFiApiError("Invalid JSON response from API") from e
+
+    async def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        kwargs: Dict[str, Any],
+        cacheable: bool = False
+    ) -> Dict[str, Any]:
+        """Issue a single request and return the decoded JSON body"""
+        cache = self._etag_cache if cacheable else None
+        cache_key = _ETagCache.key(url, params)
+        cached_body: Optional[bytes] = None
+        if cache is not None:
+            kwargs, cached_body = cache.conditional_request(cache_key, kwargs)
+
+        client = await self._get_client()
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            response = await client.request(method, url, params=params, **kwargs)
+        finally:
+            await self._release_client(client)
+
+        content: Optional[bytes] = None
+        if cache is not None:
+            content = cache.resolve(
+                cache_key, cached_body, response.status_code,
+                response.headers, response.content
+            )
+        if content is None:
+            response.raise_for_status()
+            content = response.content
+        if not content:
+            # e.g. 204 No Content; nothing to decode
+            return {}
+
+        # Decoded per call, so callers never share a cached body
+        body: Dict[str, Any] = _json_loads(content)
+        return body
+
+    async def _iter_pages(
+        self,
+        fetch_page: Callable[[Optional[str]], Awaitable[Dict[str, Any]]],
+        prefetch: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Follow nextToken across pages and yield the items of each page.
+
+        Args:
+            fetch_page: Callable that fetches one page given a next token
+            prefetch: Request the next page in a background task while the
+                     current page is being consumed
+
+        Yields:
+            Items from the "data" list of every page
+        """
+        pending: Optional["asyncio.Future[Dict[str, Any]]"] = None
+        try:
+            page = await fetch_page(None)
+            while True:
+                next_token = page.get("nextToken")
+                if next_token and prefetch:
+                    pending = asyncio.ensure_future(fetch_page(next_token))
+
+                for item in page.get("data", []):
+                    yield item
+
+                if not next_token:
+                    return
+                if pending is not None:
+                    page = await pending
+                    pending = None
+                else:
+                    page = await fetch_page(next_token)
+        finally:
+            # Abandoned mid-page: don't leave the prefetch running
+            if pending is not None:
+                pending.cancel()
+
+    async def close(self) -> None:
+        """Close the session"""
+        client = self._client
+        self._client = None
+        self._client_created_at = 0.0
+        if client is not None:
+            await client.aclose()
+
+    async def __aenter__(self) -> "AsyncUniFiApiClient":
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
+        await self.close()
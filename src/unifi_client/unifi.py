@@ -1,161 +1,418 @@
 import requests
 import logging
+import random
+import re
+import weakref
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import lru_cache
 from threading import Lock
+from time import monotonic
+from types import MappingProxyType
 from requests.adapters import HTTPAdapter
-from typing import Optional, Any, Dict, List
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+import urllib3
+from urllib3.util.retry import Retry
+from typing import (
+    Optional,
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterator,
+    List,
+    Mapping,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+try:
+    import orjson
+
+    _json_loads: Callable[[bytes], Any] = orjson.loads
+except ImportError:  # pragma: no cover - exercised without the "fast" extra
+    import json
+
+    _json_loads = json.loads
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - exercised without the "stream" extra
+    ijson = None
 
 logger = logging.getLogger(__name__)
 
-
-class UniFiApiError(Exception):
+_STREAM_DECODE_ERRORS: Tuple[Type[Exception], ...] = (
+    (ValueError,) if ijson is None else (ValueError, ijson.JSONError)
+)
+
+_T = TypeVar("_T")
+_ResponseT = TypeVar("_ResponseT")
+_PagesT = TypeVar("_PagesT")
+
+_API_ROOT = "https://api.ui.com"
+# Early-access endpoints are served from the API root, not the versioned base
+_EA_PREFIX = "ea/"
+
+# ISP metrics endpoints per interval; doubles as the set of valid 'type' values
+_ISP_METRICS_ENDPOINTS = {
+    "5m": "ea/isp-metrics/5m",
+    "1h": "ea/isp-metrics/1h",
+}
+_ISP_METRICS_QUERY_ENDPOINTS = {
+    "5m": "ea/isp-metrics/5m/query",
+    "1h": "ea/isp-metrics/1h/query",
+}
+
+# A 401/403 on a session younger than this points at a bad API key rather
+# than a stale session, so the refresh-and-retry is skipped
+_AUTH_RETRY_MIN_SESSION_AGE = 30.0
+
+# Transport-level retry backoff: exponential from _RETRY_BACKOFF_FACTOR, spread
+# by up to _RETRY_JITTER of itself so concurrent clients don't retry in
+# lockstep, and never longer than _RETRY_BACKOFF_MAX seconds
+_RETRY_BACKOFF_FACTOR = 1.0
+_RETRY_BACKOFF_MAX = 30.0
+_RETRY_JITTER = 0.5
+
+# Statuses retried at the transport level. POST drops 502, which the ISP
+# metrics query returns when the account lacks access to a requested site
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+_POST_RETRY_STATUSES = (429, 500, 503, 504)
+
+# Shape of an RFC3339 date-time; fromisoformat alone also accepts dates without
+# a time, week dates and other ISO 8601 forms that are not valid RFC3339. The
+# groups (date-time, fraction, offset) are what _parse_rfc3339 rebuilds from,
+# so anything this matches reaches fromisoformat in a form every Python accepts
+_RFC3339_RE = re.compile(
+    r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:\d{2})"
+)
+
+# Error bodies are logged only up to this many bytes
+_LOGGED_BODY_LIMIT = 512
+
+_PAGE_SIZE_RANGE = range(1, 101)
+_DEFAULT_PAGE_SIZE = 10
+
+# Shared, read-only params for the common first-page request; requests copies
+# the mapping while preparing the URL so handing out one instance is safe
+_DEFAULT_PAGINATION_PARAMS: Mapping[str, Any] = MappingProxyType(
+    {"pageSize": _DEFAULT_PAGE_SIZE}
+)
+
+
+def _validate_page_size(page_size: int) -> None:
+    """Validate page_size parameter"""
+    if page_size not in _PAGE_SIZE_RANGE:
+        raise ValueError("page_size must be between 1 and 100")
+
+
+def _pagination_params(page_size: int, next_token: Optional[str]) -> Mapping[str, Any]:
+    """Validate pagination arguments and build the matching query params"""
+    _validate_page_size(page_size)
+    if page_size == _DEFAULT_PAGE_SIZE and not next_token:
+        return _DEFAULT_PAGINATION_PARAMS
+
+    params: Dict[str, Any] = {"pageSize": page_size}
+    if next_token:
+        params["nextToken"] = next_token
+    return params
+
+
+@lru_cache(maxsize=512)
+def _parse_rfc3339(timestamp: str) -> datetime:
     """
-    Custom exception for UniFi API errors
+    Parse an RFC3339 timestamp, memoised since paginated and polling callers
+    pass the same timestamps over and over.
+
+    Raises:
+        ValueError: If timestamp format is invalid
     """
-    pass
+    match = _RFC3339_RE.fullmatch(timestamp) if isinstance(timestamp, str) else None
+    if match is None:
+        raise ValueError(_rfc3339_error(timestamp))
 
+    # Before Python 3.11 fromisoformat only takes 3 or 6 fractional digits and
+    # no Z suffix, so hand it exactly microseconds and a numeric offset
+    date_time, fraction, offset = match.groups()
+    microseconds = (fraction or "")[:6].ljust(6, "0")
+    if offset == "Z":
+        offset = "+00:00"
 
-class UniFiApiClient:
-    def __init__(
-        self,
-        api_key: str,
-        api_version: str = "v1",
-        timeout: int = 30,
-        session_ttl_minutes: int = 55,
-    ) -> None:
-        if not api_key:
-            raise ValueError("API key cannot be empty")
+    try:
+        return datetime.fromisoformat(f"{date_time}.{microseconds}{offset}")
+    except ValueError as e:
+        # The shape matched, so only field ranges fail here, e.g. month 13
+        raise ValueError(_rfc3339_error(timestamp)) from e
 
-        self.api_key = api_key
-        self.api_version = api_version
-        self.base_url = f"https://api.ui.com/{self.api_version}"
-        self.timeout = timeout
-        self.session_ttl = timedelta(minutes=session_ttl_minutes)
 
-        self._session: Optional[requests.Session] = None
-        self._session_created_at: Optional[datetime] = None
-        self._lock = Lock()
+@lru_cache(maxsize=128)
+def _join_ids(ids: Tuple[str, ...]) -> str:
+    """Join IDs into a comma-separated filter, memoised for polling callers"""
+    return ",".join(ids)
 
-    @property
-    def session(self) -> requests.Session:
-        """Get or create session with automatic refresh"""
-        with self._lock:
-            now = datetime.now()
 
-            # Create new session if doesn't exist or expired
-            if (
-                self._session is None
-                or self._session_created_at is None
-                or now - self._session_created_at > self.session_ttl
-            ):
-                if self._session:
-                    logger.info("Session expired, creating new session")
-                    self._session.close()
+def _rfc3339_error(timestamp: str) -> str:
+    """Build the error message for an invalid RFC3339 timestamp"""
+    return (
+        f"Invalid RFC3339 timestamp format: {timestamp}. Expected format: "
+        "YYYY-MM-DDTHH:MM:SS[.sss]Z or YYYY-MM-DDTHH:MM:SS[.sss]±HH:MM"
+    )
 
-                self._session = self._create_session()
-                self._session_created_at = now
-                logger.debug(f"New session created at {now}")
 
-            return self._session
+def _close_quietly(session: requests.Session) -> None:
+    """Close a session left open by a garbage-collected client"""
+    try:
+        session.close()
+    except Exception:  # pragma: no cover - only at interpreter shutdown
+        pass
 
-    def _create_session(self) -> requests.Session:
-        """Create a new configured session"""
-        session = requests.Session()
-        session.headers.update(
-            {
-                "Accept": "application/json",
-                "X-API-Key": self.api_key,
-                "User-Agent": "UniFiApiClient/1.0",
-            }
-        )
 
-        adapter = HTTPAdapter(
-            pool_connections=10, pool_maxsize=20, max_retries=3, pool_block=False
+def _short_body(response: Any, limit: int = _LOGGED_BODY_LIMIT) -> str:
+    """Decode at most the first limit bytes of a response body for logging"""
+    head: bytes = response.content[:limit]
+    return head.decode("utf-8", "replace")
+
+
+def _iter_json_items(response: requests.Response) -> Iterator[Any]:
+    """
+    Yield the entries of the "data" list of a streamed response.
+
+    With ijson installed the body is parsed incrementally while it is being
+    received; otherwise it is read in full and decoded at once.
+    """
+    if ijson is None:
+        body = _json_loads(response.content)
+        yield from body.get("data", [])
+        return
+
+    # Let urllib3 undo any gzip/deflate content encoding while streaming
+    response.raw.decode_content = True
+    yield from ijson.items(response.raw, "data.item", use_float=True)
+
+
+class _ETagCache:
+    """
+    Bounded LRU of GET response bodies keyed by URL and query params.
+
+    Only requests made with cacheable=True use it: the host and site lookups
+    that are polled repeatedly. Device lists, metrics and pages past the first
+    are large or single-use and would only push those entries out.
+
+    Entries keep the ETag the API returned so the next request for the same
+    resource can be sent with If-None-Match and answered by a 304. Bodies are
+    stored as the raw bytes received and decoded again on every hit, so each
+    caller gets its own dictionary and mutating it cannot corrupt the cache.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Tuple[str, bytes]]" = (
+            OrderedDict()
         )
-        session.mount("https://", adapter)
-        session.mount("http://", adapter)
+        self._lock = Lock()
 
-        return session
+    @staticmethod
+    def key(url: str, params: Optional[Mapping[str, Any]]) -> Hashable:
+        """Build the cache key for a request"""
+        return (url, frozenset(params.items()) if params else None)
 
-    def refresh_session(self) -> None:
-        """Manually force session refresh"""
+    def get(self, key: Hashable) -> Optional[Tuple[str, bytes]]:
+        """Return the cached (etag, body) pair for key, if any"""
         with self._lock:
-            if self._session:
-                self._session.close()
-            self._session = None
-            self._session_created_at = None
-        logger.info("Session manually refreshed")
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
 
-    def _make_request(
+    def put(
         self,
-        method: str,
-        endpoint: str,
-        params: Optional[dict] = None,
-        **kwargs
-    ) -> Dict[str, Any]:
-        """
-        Centralized request handler with automatic retry on auth failures.
+        key: Hashable,
+        response_headers: Mapping[str, str],
+        body: bytes
+    ) -> None:
+        """Store body if the response carries an ETag and allows caching"""
+        etag = response_headers.get("ETag")
+        if not etag or "no-store" in response_headers.get("Cache-Control", ""):
+            return
 
-        Args:
-            method: HTTP method (GET, POST, etc.)
-            endpoint: API endpoint path (without base URL)
-            params: Query parameters
-            **kwargs: Additional arguments to pass to requests
+        with self._lock:
+            self._entries[key] = (etag, body)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
 
-        Returns:
-            Parsed JSON response
+    def conditional_request(
+        self,
+        key: Hashable,
+        kwargs: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Optional[bytes]]:
+        """
+        Add If-None-Match for key's cached entry to a request's kwargs.
 
-        Raises:
-            UniFiApiError: If the API request fails
+        Returns the kwargs to send and the cached body a 304 would confirm,
+        or the kwargs unchanged and None when nothing is cached.
         """
-        url = f"{self.base_url}/{endpoint}"
+        entry = self.get(key)
+        if entry is None:
+            return kwargs, None
+        headers = dict(kwargs.get("headers") or {})
+        headers["If-None-Match"] = entry[0]
+        return {**kwargs, "headers": headers}, entry[1]
+
+    def resolve(
+        self,
+        key: Hashable,
+        cached_body: Optional[bytes],
+        status_code: int,
+        response_headers: Mapping[str, str],
+        content: bytes
+    ) -> Optional[bytes]:
+        """
+        Return cached_body if the response is a 304 confirming it; otherwise
+        store a successful response's body and return None.
+        """
+        if cached_body is not None and status_code == 304:
+            return cached_body
+        if content and 200 <= status_code < 300:
+            self.put(key, response_headers, content)
+        return None
+
+
+class _JitteredRetry(Retry):
+    """Retry whose exponential backoff is jittered and capped"""
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return 0
+        return min(
+            _RETRY_BACKOFF_MAX,
+            backoff * (1 + random.random() * _RETRY_JITTER)
+        )
 
-        def _attempt_request():
-            response = self.session.request(
-                method=method,
-                url=url,
-                params=params,
-                timeout=self.timeout,
-                **kwargs
-            )
-            response.raise_for_status()
-            return response.json()
+    def is_retry(
+        self,
+        method: str,
+        status_code: int,
+        has_retry_after: bool = False
+    ) -> bool:
+        if method.upper() == "POST" and status_code not in _POST_RETRY_STATUSES:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _build_adapter(
+    pool_connections: int,
+    pool_maxsize: int,
+    max_retries: int
+) -> HTTPAdapter:
+    """Build the retrying HTTPS adapter sessions send their requests through"""
+    # Transient errors are retried inside urllib3 with jittered exponential
+    # backoff, waiting for Retry-After instead when the server sends one;
+    # the final response is returned so raise_for_status() still applies
+    retry = _JitteredRetry(
+        total=max_retries,
+        backoff_factor=_RETRY_BACKOFF_FACTOR,
+        status_forcelist=_RETRY_STATUSES,
+        # POST is only used by the read-only ISP metrics query endpoints
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    return HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry,
+        pool_block=False
+    )
+
+
+# Connection pool mounted on the sessions of every client created with
+# shared_pool=True, whatever their API key; requests carry the key as a
+# session header, so only the sockets to api.ui.com are shared
+_SHARED_ADAPTER = _build_adapter(pool_connections=1, pool_maxsize=100, max_retries=3)
 
-        try:
-            return _attempt_request()
 
-        except requests.HTTPError as e:
-            # Retry once on auth errors
-            if e.response.status_code in (401, 403):
-                logger.warning(f"Authentication error (HTTP {e.response.status_code}), refreshing session")
-                self.refresh_session()
-                try:
-                    return _attempt_request()
-                except requests.HTTPError as retry_error:
-                    logger.error(f"Retry failed: {retry_error.response.status_code} - {retry_error.response.text}")
-                    raise UniFiApiError(f"API request failed after retry: {retry_error.response.status_code}") from retry_error
+class UniFiApiError(Exception):
+    """
+    Custom exception for UniFi API errors
 
-            logger.error(f"HTTP error: {e.response.status_code} - {e.response.text}")
-            raise UniFiApiError(f"API request failed: {e.response.status_code}") from e
+    Accepts a %-style message and its arguments, like the logging calls, and
+    only formats them when the error is rendered. Arguments that don't form a
+    %-style message render the way a plain Exception would.
+    """
 
-        except requests.Timeout:
-            logger.error(f"Request timed out after {self.timeout} seconds")
-            raise UniFiApiError(f"Request timed out after {self.timeout} seconds")
+    def __str__(self) -> str:
+        if (
+            len(self.args) > 1
+            and isinstance(self.args[0], str)
+            and "%" in self.args[0]
+        ):
+            try:
+                message: str = self.args[0] % self.args[1:]
+                return message
+            except (TypeError, ValueError):
+                pass
+        return super().__str__()
+
+
+class _UniFiEndpoints(ABC, Generic[_ResponseT, _PagesT]):
+    """
+    Endpoint definitions shared by the sync and async clients.
 
-        except requests.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
-            raise UniFiApiError(f"Request failed: {str(e)}") from e
+    Subclasses implement _make_request and _iter_pages; every endpoint
+    validates its arguments and returns whatever _make_request returns, a
+    parsed dictionary for UniFiApiClient and an awaitable of one for
+    AsyncUniFiApiClient. Likewise the iter_* methods return whatever
+    _iter_pages returns, an iterator or an async iterator of items.
+    """
 
-        except ValueError as e:
-            logger.error(f"Invalid JSON response: {str(e)}")
-            raise UniFiApiError("Invalid JSON response from API") from e
+    __slots__ = ("_session_ttl_seconds",)
 
-    def _validate_page_size(self, page_size: int) -> None:
-        """Validate page_size parameter"""
-        if not 1 <= page_size <= 100:
-            raise ValueError("page_size must be between 1 and 100")
+    base_url: str
 
-    def _validate_rfc3339(self, timestamp: str) -> datetime:
+    @property
+    def session_ttl(self) -> timedelta:
+        """How long a session is used before its state is renewed"""
+        return timedelta(seconds=self._session_ttl_seconds)
+
+    @session_ttl.setter
+    def session_ttl(self, value: timedelta) -> None:
+        # Stored as float seconds, which is what the per-request check reads
+        self._session_ttl_seconds = value.total_seconds()
+
+    @abstractmethod
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Mapping[str, Any]] = None,
+        cacheable: bool = False,
+        **kwargs: Any
+    ) -> _ResponseT:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _iter_pages(
+        self,
+        fetch_page: Callable[[Optional[str]], _ResponseT],
+        prefetch: bool = False
+    ) -> _PagesT:
+        raise NotImplementedError
+
+    def _url(self, endpoint: str) -> str:
+        """Resolve an endpoint path to its absolute URL"""
+        if endpoint.startswith(_EA_PREFIX):
+            return f"{_API_ROOT}/{endpoint}"
+        return f"{self.base_url}/{endpoint}"
+
+    @staticmethod
+    def _validate_rfc3339(timestamp: str) -> datetime:
         """
         Validate and parse RFC3339 timestamp.
 
@@ -168,19 +425,10 @@ class UniFiApiClient:
         Raises:
             ValueError: If timestamp format is invalid
         """
-        try:
-            # Handle both Z and timezone offset formats
-            if timestamp.endswith('Z'):
-                return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ")
-            else:
-                # Remove colon from timezone for strptime
-                timestamp_clean = timestamp[:-3] + timestamp[-2:]
-                return datetime.strptime(timestamp_clean, "%Y-%m-%dT%H:%M:%S.%f%z")
-        except ValueError as e:
-            raise ValueError(f"Invalid RFC3339 timestamp format: {timestamp}. Expected format: YYYY-MM-DDTHH:MM:SS.sssZ or YYYY-MM-DDTHH:MM:SS.sss±HH:MM") from e
+        return _parse_rfc3339(timestamp)
 
+    @staticmethod
     def _validate_timestamp_range(
-        self,
         begin_timestamp: Optional[str],
         end_timestamp: Optional[str]
     ) -> None:
@@ -197,17 +445,51 @@ class UniFiApiClient:
         if not (begin_timestamp and end_timestamp):
             return
 
-        begin_dt = self._validate_rfc3339(begin_timestamp)
-        end_dt = self._validate_rfc3339(end_timestamp)
+        begin_dt = _parse_rfc3339(begin_timestamp)
+        end_dt = _parse_rfc3339(end_timestamp)
 
         if end_dt <= begin_dt:
             raise ValueError("'end_timestamp' must be strictly greater than 'begin_timestamp'")
 
+    def _isp_metrics_params(
+        self,
+        type: str,
+        begin_timestamp: Optional[str],
+        end_timestamp: Optional[str],
+        duration: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Validate ISP metrics arguments and build the matching request fields.
+
+        Raises:
+            ValueError: If parameters are invalid
+        """
+        # Validation
+        if type not in _ISP_METRICS_ENDPOINTS:
+            raise ValueError("'type' parameter must be either '5m' or '1h'")
+
+        if duration and (begin_timestamp or end_timestamp):
+            raise ValueError("'duration' cannot be used with begin_timestamp or end_timestamp")
+
+        # Validate and compare timestamps
+        if begin_timestamp or end_timestamp:
+            self._validate_timestamp_range(begin_timestamp, end_timestamp)
+
+        return {
+            key: value
+            for key, value in (
+                ("duration", duration),
+                ("beginTimestamp", begin_timestamp),
+                ("endTimestamp", end_timestamp),
+            )
+            if value
+        }
+
     def list_hosts(
         self,
         page_size: int = 10,
         next_token: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> _ResponseT:
         """
         List UniFi hosts with pagination support.
 
@@ -222,14 +504,12 @@ class UniFiApiClient:
             UniFiApiError: If the API request fails
             ValueError: If page_size is invalid
         """
-        self._validate_page_size(page_size)
-        params = {"pageSize": str(page_size)}
-        if next_token:
-            params["nextToken"] = next_token
-
-        return self._make_request("GET", "hosts", params=params)
+        params = _pagination_params(page_size, next_token)
+        return self._make_request(
+            "GET", "hosts", params=params, cacheable=next_token is None
+        )
 
-    def get_host_by_id(self, host_id: str) -> Dict[str, Any]:
+    def get_host_by_id(self, host_id: str) -> _ResponseT:
         """
         Retrieves detailed information about a specific host by ID.
 
@@ -246,13 +526,13 @@ class UniFiApiClient:
         if not host_id:
             raise ValueError("host_id cannot be empty")
 
-        return self._make_request("GET", f"hosts/{host_id}")
+        return self._make_request("GET", "hosts/" + host_id, cacheable=True)
 
     def list_sites(
         self,
         page_size: int = 10,
         next_token: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> _ResponseT:
         """
         Retrieves a list of all sites (from hosts running the UniFi Network application)
         associated with the UI account making the API call.
@@ -268,12 +548,10 @@ class UniFiApiClient:
             UniFiApiError: If the API request fails
             ValueError: If page_size is invalid
         """
-        self._validate_page_size(page_size)
-        params = {"pageSize": str(page_size)}
-        if next_token:
-            params["nextToken"] = next_token
-
-        return self._make_request("GET", "sites", params=params)
+        params = _pagination_params(page_size, next_token)
+        return self._make_request(
+            "GET", "sites", params=params, cacheable=next_token is None
+        )
 
     def list_devices(
         self,
@@ -281,7 +559,7 @@ class UniFiApiClient:
         host_ids: Optional[List[str]] = None,
         page_size: int = 10,
         next_token: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> _ResponseT:
         """
         Retrieves a list of UniFi devices managed by hosts where the UI account
         making the API call is the owner or a super admin.
@@ -299,18 +577,13 @@ class UniFiApiClient:
             UniFiApiError: If the API request fails
             ValueError: If page_size is invalid or time format is invalid
         """
-        self._validate_page_size(page_size)
+        params = dict(_pagination_params(page_size, next_token))
         if time:
             self._validate_rfc3339(time)
-
-        params = {"pageSize": str(page_size)}
-        if next_token:
-            params["nextToken"] = next_token
-        if time:
             params["time"] = time
         if host_ids:
             # Adjust format based on actual API specification
-            params["hostIds"] = ",".join(host_ids)
+            params["hostIds"] = _join_ids(tuple(host_ids))
 
         return self._make_request("GET", "devices", params=params)
 
@@ -320,7 +593,7 @@ class UniFiApiClient:
         begin_timestamp: Optional[str] = None,
         end_timestamp: Optional[str] = None,
         duration: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> _ResponseT:
         """
         Retrieves ISP metrics data for all sites linked to the UI account's API key.
         5-minute interval metrics are available for at least 24 hours, and 1-hour
@@ -341,27 +614,8 @@ class UniFiApiClient:
             UniFiApiError: If the API request fails
             ValueError: If parameters are invalid
         """
-        # Validation
-        if type not in ("5m", "1h"):
-            raise ValueError("'type' parameter must be either '5m' or '1h'")
-
-        if duration and (begin_timestamp or end_timestamp):
-            raise ValueError("'duration' cannot be used with begin_timestamp or end_timestamp")
-
-        # Validate and compare timestamps
-        if begin_timestamp or end_timestamp:
-            self._validate_timestamp_range(begin_timestamp, end_timestamp)
-
-        # Build params
-        params = {}
-        if duration:
-            params["duration"] = duration
-        if begin_timestamp:
-            params["beginTimestamp"] = begin_timestamp
-        if end_timestamp:
-            params["endTimestamp"] = end_timestamp
-
-        return self._make_request("GET", f"ea/isp-metrics/{type}", params=params)
+        params = self._isp_metrics_params(type, begin_timestamp, end_timestamp, duration)
+        return self._make_request("GET", _ISP_METRICS_ENDPOINTS[type], params=params)
 
     def query_isp_metrics(
         self,
@@ -371,7 +625,7 @@ class UniFiApiClient:
         duration: Optional[str] = None,
         site_ids: Optional[List[str]] = None,
         host_ids: Optional[List[str]] = None
-    ) -> Dict[str, Any]:
+    ) -> _ResponseT:
         """
         Retrieves ISP metrics data based on specific query parameters.
         5-minute interval metrics are available for at least 24 hours, and 1-hour
@@ -397,33 +651,16 @@ class UniFiApiClient:
             UniFiApiError: If the API request fails
             ValueError: If parameters are invalid
         """
-        # Validation
-        if type not in ("5m", "1h"):
-            raise ValueError("'type' parameter must be either '5m' or '1h'")
-
-        if duration and (begin_timestamp or end_timestamp):
-            raise ValueError("'duration' cannot be used with begin_timestamp or end_timestamp")
-
-        # Validate and compare timestamps
-        if begin_timestamp or end_timestamp:
-            self._validate_timestamp_range(begin_timestamp, end_timestamp)
-
-        # Build request body
-        body = {}
-        if duration:
-            body["duration"] = duration
-        if begin_timestamp:
-            body["beginTimestamp"] = begin_timestamp
-        if end_timestamp:
-            body["endTimestamp"] = end_timestamp
-        if site_ids:
-            body["siteIds"] = site_ids
-        if host_ids:
-            body["hostIds"] = host_ids
+        body = self._isp_metrics_params(type, begin_timestamp, end_timestamp, duration)
+        body.update(
+            (key, value)
+            for key, value in (("siteIds", site_ids), ("hostIds", host_ids))
+            if value
+        )
 
-        return self._make_request("POST", f"ea/isp-metrics/{type}/query", json=body)
+        return self._make_request("POST", _ISP_METRICS_QUERY_ENDPOINTS[type], json=body)
 
-    def list_sd_wan_configs(self) -> Dict[str, Any]:
+    def list_sd_wan_configs(self) -> _ResponseT:
         """
         Retrieves a list of all SD-WAN configurations associated with the UI account
         making the API call.
@@ -436,7 +673,7 @@ class UniFiApiClient:
         """
         return self._make_request("GET", "ea/sd-wan-configs")
 
-    def get_sd_wan_config_by_id(self, config_id: str) -> Dict[str, Any]:
+    def get_sd_wan_config_by_id(self, config_id: str) -> _ResponseT:
         """
         Retrieves detailed information about a specific SD-WAN configuration by ID.
 
@@ -453,9 +690,9 @@ class UniFiApiClient:
         if not config_id:
             raise ValueError("config_id cannot be empty")
 
-        return self._make_request("GET", f"ea/sd-wan-configs/{config_id}")
+        return self._make_request("GET", "ea/sd-wan-configs/" + config_id)
 
-    def get_sd_wan_config_status(self, config_id: str) -> Dict[str, Any]:
+    def get_sd_wan_config_status(self, config_id: str) -> _ResponseT:
         """
         Retrieves the status of a specific SD-WAN configuration, including deployment
         progress, errors, and associated hubs.
@@ -473,21 +710,510 @@ class UniFiApiClient:
         if not config_id:
             raise ValueError("config_id cannot be empty")
 
-        return self._make_request("GET", f"ea/sd-wan-configs/{config_id}/status")
+        return self._make_request("GET", "ea/sd-wan-configs/" + config_id + "/status")
+
+    def iter_hosts(
+        self,
+        page_size: int = 100,
+        prefetch: bool = False
+    ) -> _PagesT:
+        """
+        Iterate over all UniFi hosts, following pagination automatically.
+
+        Args:
+            page_size: Number of results per page (1-100)
+            prefetch: Fetch the next page in the background while the current
+                     page is being consumed
+
+        Yields:
+            Host entries from every page
+
+        Raises:
+            UniFiApiError: If an API request fails
+            ValueError: If page_size is invalid
+        """
+        _validate_page_size(page_size)
+        return self._iter_pages(
+            lambda token: self.list_hosts(page_size=page_size, next_token=token),
+            prefetch=prefetch
+        )
+
+    def iter_sites(
+        self,
+        page_size: int = 100,
+        prefetch: bool = False
+    ) -> _PagesT:
+        """
+        Iterate over all sites, following pagination automatically.
+
+        Args:
+            page_size: Number of results per page (1-100)
+            prefetch: Fetch the next page in the background while the current
+                     page is being consumed
+
+        Yields:
+            Site entries from every page
+
+        Raises:
+            UniFiApiError: If an API request fails
+            ValueError: If page_size is invalid
+        """
+        _validate_page_size(page_size)
+        return self._iter_pages(
+            lambda token: self.list_sites(page_size=page_size, next_token=token),
+            prefetch=prefetch
+        )
+
+    def iter_devices(
+        self,
+        time: Optional[str] = None,
+        host_ids: Optional[List[str]] = None,
+        page_size: int = 100,
+        prefetch: bool = False
+    ) -> _PagesT:
+        """
+        Iterate over all devices, following pagination automatically.
+
+        Args:
+            time: Last processed timestamp of devices in RFC3339 format
+            host_ids: List of host IDs to filter the results
+            page_size: Number of results per page (1-100)
+            prefetch: Fetch the next page in the background while the current
+                     page is being consumed
+
+        Yields:
+            Entries of the "data" list from every page
+
+        Raises:
+            UniFiApiError: If an API request fails
+            ValueError: If page_size is invalid or time format is invalid
+        """
+        _validate_page_size(page_size)
+        if time:
+            self._validate_rfc3339(time)
+
+        return self._iter_pages(
+            lambda token: self.list_devices(
+                time=time, host_ids=host_ids, page_size=page_size, next_token=token
+            ),
+            prefetch=prefetch
+        )
+
+
+class UniFiApiClient(_UniFiEndpoints[Dict[str, Any], Iterator[Dict[str, Any]]]):
+    # Fixed attribute set; __weakref__ is kept for the session finalizer
+    __slots__ = (
+        "api_key",
+        "api_version",
+        "base_url",
+        "timeout",
+        "pool_maxsize",
+        "pool_connections",
+        "max_retries",
+        "shared_pool",
+        "_default_headers",
+        "_session",
+        "_session_created_at",
+        "_session_renewed_at",
+        "_finalizer",
+        "_lock",
+        "_etag_cache",
+        "__weakref__",
+    )
+
+    def __init__(
+        self,
+        api_key: str,
+        api_version: str = "v1",
+        timeout: int = 30,
+        session_ttl_minutes: int = 55,
+        pool_maxsize: int = 50,
+        etag_cache_size: int = 128,
+        max_retries: int = 3,
+        pool_connections: int = 1,
+        shared_pool: bool = False,
+    ) -> None:
+        if not api_key:
+            raise ValueError("API key cannot be empty")
+
+        self.api_key = api_key
+        self.api_version = api_version
+        self.base_url = f"{_API_ROOT}/{self.api_version}"
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.pool_connections = pool_connections
+        self.shared_pool = shared_pool
+        self.max_retries = max_retries
+        self.session_ttl = timedelta(minutes=session_ttl_minutes)
+
+        # Built once; urllib3 only advertises br when a brotli decoder is installed
+        self._default_headers = {
+            "Accept": "application/json",
+            "Accept-Encoding": DEFAULT_ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+            "X-API-Key": self.api_key,
+            "User-Agent": "UniFiApiClient/1.0",
+        }
+
+        self._session: Optional[requests.Session] = None
+        self._session_created_at: float = 0.0
+        # TTL clock; renewing an expired session resets this but keeps the
+        # session (and its pooled connections) alive
+        self._session_renewed_at: float = 0.0
+        # Closes the pool if the client is dropped without close(); holds the
+        # session only, never the client, and is detached on explicit close
+        self._finalizer: Optional[weakref.finalize] = None
+        self._lock = Lock()
+        self._etag_cache = _ETagCache(etag_cache_size) if etag_cache_size > 0 else None
+
+    @property
+    def session(self) -> requests.Session:
+        """Get or create session with automatic refresh"""
+        # Fast path: a live session is returned without taking the lock
+        session = self._session
+        if (
+            session is not None
+            and monotonic() - self._session_renewed_at <= self._session_ttl_seconds
+        ):
+            return session
+
+        with self._lock:
+            now = monotonic()
+
+            # Re-check under the lock, another thread may have refreshed it
+            if self._session is None:
+                self._session = self._create_session()
+                if not self.shared_pool:
+                    self._finalizer = weakref.finalize(self, _close_quietly, self._session)
+                self._session_created_at = now
+                self._session_renewed_at = now
+                logger.debug("New session created")
+            elif now - self._session_renewed_at > self._session_ttl_seconds:
+                logger.info("Session expired, renewing session state")
+                self._renew_session(self._session)
+                self._session_renewed_at = now
+
+            return self._session
+
+    def _renew_session(self, session: requests.Session) -> None:
+        """
+        Reset an expired session's cookies and headers in place.
+
+        The API key never rotates under a session, so there is nothing to gain
+        from rebuilding it, and reusing it keeps the pooled keep-alive
+        connections instead of paying for fresh TLS handshakes.
+        """
+        session.cookies.clear()
+        session.headers.update(self._default_headers)
+
+    @staticmethod
+    def close_shared_pool() -> None:
+        """Close the connections pooled for clients created with shared_pool=True"""
+        _SHARED_ADAPTER.close()
+
+    def _create_session(self) -> requests.Session:
+        """Create a new configured session"""
+        session = requests.Session()
+        session.headers.update(self._default_headers)
+
+        if self.shared_pool:
+            session.mount("https://", _SHARED_ADAPTER)
+        else:
+            # Every request goes to api.ui.com, so one host pool holding up to
+            # pool_maxsize keep-alive sockets is all that is needed
+            session.mount(
+                "https://",
+                _build_adapter(self.pool_connections, self.pool_maxsize, self.max_retries)
+            )
+
+        return session
+
+    def refresh_session(self) -> None:
+        """Manually force session refresh"""
+        self._discard_session()
+        logger.info("Session manually refreshed")
+
+    def _discard_session(self, expected: Optional[requests.Session] = None) -> None:
+        """
+        Drop the current session and close its connection pool.
+
+        Args:
+            expected: Only discard the current session if it is this one
+        """
+        # Swap under the lock, tear the old pool down outside of it
+        with self._lock:
+            session = self._session
+            if expected is not None and session is not expected:
+                # Another caller already replaced it
+                return
+            finalizer = self._finalizer
+            self._session = None
+            self._finalizer = None
+            self._session_created_at = 0.0
+        if finalizer is not None:
+            finalizer.detach()
+        # Closing the session would close the shared adapter mounted on it,
+        # see close_shared_pool()
+        if session is not None and not self.shared_pool:
+            session.close()
+
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Mapping[str, Any]] = None,
+        cacheable: bool = False,
+        **kwargs: Any
+    ) -> Dict[str, Any]:
+        """
+        Centralized request handler with automatic retry on auth failures.
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            endpoint: API endpoint path (without base URL)
+            params: Query parameters
+            cacheable: Revalidate the response through the ETag cache
+            **kwargs: Additional arguments to pass to requests
+
+        Returns:
+            Parsed JSON response
+
+        Raises:
+            UniFiApiError: If the API request fails
+        """
+        url = self._url(endpoint)
+        return self._call(self._send, method, url, params, kwargs, cacheable)
+
+    def _call(self, send: Callable[..., _T], *args: Any) -> _T:
+        """
+        Run a single request attempt, retrying once on auth failures and
+        translating transport and decoding errors to UniFiApiError.
+
+        Args:
+            send: Callable performing the request
+            *args: Arguments passed to send
+
+        Returns:
+            Whatever send returns
+
+        Raises:
+            UniFiApiError: If the API request fails
+        """
+        # Age the failure against the session that sent the request; by the
+        # time it arrives another caller may already have replaced it
+        session = self.session
+        created_at = self._session_created_at
+        try:
+            return send(*args)
+
+        except requests.HTTPError as e:
+            # Retry once on auth errors, unless the session was just created
+            session_age = monotonic() - created_at
+            if (
+                e.response.status_code in (401, 403)
+                and session_age > _AUTH_RETRY_MIN_SESSION_AGE
+            ):
+                logger.warning("Authentication error (HTTP %s), refreshing session", e.response.status_code)
+                self._discard_session(session)
+                try:
+                    return send(*args)
+                except requests.HTTPError as retry_error:
+                    logger.error(
+                        "Retry failed: %s - %s",
+                        retry_error.response.status_code,
+                        _short_body(retry_error.response)
+                    )
+                    raise UniFiApiError("API request failed after retry: %s", retry_error.response.status_code) from retry_error
+
+            logger.error("HTTP error: %s - %s", e.response.status_code, _short_body(e.response))
+            raise UniFiApiError("API request failed: %s", e.response.status_code) from e
+
+        except requests.Timeout:
+            logger.error("Request timed out after %s seconds", self.timeout)
+            raise UniFiApiError("Request timed out after %s seconds", self.timeout)
+
+        except requests.RequestException as e:
+            logger.error("Request failed: %s", e)
+            raise UniFiApiError("Request failed: %s", e) from e
+
+        except ValueError as e:
+            logger.error("Invalid JSON response: %s", e)
+            raise UniFiApiError("Invalid JSON response from API") from e
+
+    def _send(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        kwargs: Dict[str, Any],
+        cacheable: bool = False
+    ) -> Dict[str, Any]:
+        """Issue a single request and return the decoded JSON body"""
+        cache = self._etag_cache if cacheable else None
+        cache_key = _ETagCache.key(url, params)
+        cached_body: Optional[bytes] = None
+        if cache is not None:
+            kwargs, cached_body = cache.conditional_request(cache_key, kwargs)
+
+        response = self.session.request(
+            method=method,
+            url=url,
+            params=params,
+            timeout=self.timeout,
+            **kwargs
+        )
+        content: Optional[bytes] = None
+        if cache is not None:
+            content = cache.resolve(
+                cache_key, cached_body, response.status_code,
+                response.headers, response.content
+            )
+        if content is None:
+            response.raise_for_status()
+            content = response.content
+        if not content:
+            # e.g. 204 No Content; nothing to decode
+            return {}
+
+        # Decoded per call, so callers never share a cached body
+        body: Dict[str, Any] = _json_loads(content)
+        return body
+
+    def _open_stream(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Mapping[str, Any]],
+        kwargs: Dict[str, Any]
+    ) -> requests.Response:
+        """Issue a single streamed request and return the unread response"""
+        response = self.session.request(
+            method=method,
+            url=url,
+            params=params,
+            timeout=self.timeout,
+            stream=True,
+            **kwargs
+        )
+        try:
+            response.raise_for_status()
+        except requests.HTTPError:
+            # Buffer the error body for logging before releasing the connection
+            response.content
+            response.close()
+            raise
+        return response
+
+    def _iter_stream(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Mapping[str, Any]] = None,
+        **kwargs: Any
+    ) -> Iterator[Any]:
+        """
+        Stream a response and yield the entries of its "data" list.
+
+        The request is sent when iteration starts and the connection is
+        released once the generator is exhausted or closed.
+
+        Raises:
+            UniFiApiError: If the API request fails or the body is not valid JSON
+        """
+        url = self._url(endpoint)
+        response = self._call(self._open_stream, method, url, params, kwargs)
+        with response:
+            try:
+                yield from _iter_json_items(response)
+            except _STREAM_DECODE_ERRORS as e:
+                logger.error("Invalid JSON response: %s", e)
+                raise UniFiApiError("Invalid JSON response from API") from e
+            except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+                logger.error("Request failed: %s", e)
+                raise UniFiApiError("Request failed: %s", e) from e
+
+    def _iter_pages(
+        self,
+        fetch_page: Callable[[Optional[str]], Dict[str, Any]],
+        prefetch: bool = False
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Follow nextToken across pages and yield the items of each page.
+
+        Args:
+            fetch_page: Callable that fetches one page given a next token
+            prefetch: Request the next page in a background thread while the
+                     current page is being consumed
+
+        Yields:
+            Items from the "data" list of every page
+        """
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending: Optional[Future] = None
+        try:
+            page = fetch_page(None)
+            while True:
+                next_token = page.get("nextToken")
+                if next_token and executor is not None:
+                    pending = executor.submit(fetch_page, next_token)
+
+                yield from page.get("data", [])
+
+                if not next_token:
+                    return
+                if pending is not None:
+                    page = pending.result()
+                    pending = None
+                else:
+                    page = fetch_page(next_token)
+        finally:
+            if executor is not None:
+                # Abandoned mid-page: don't wait for a page nobody will read
+                if pending is not None:
+                    pending.cancel()
+                executor.shutdown(wait=pending is None)
+
+    def iter_isp_metrics(
+        self,
+        type: str = "5m",
+        begin_timestamp: Optional[str] = None,
+        end_timestamp: Optional[str] = None,
+        duration: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream ISP metrics and yield them one entry at a time.
+
+        Same request as get_isp_metrics, but the body is parsed incrementally
+        while it is received (with the "stream" extra installed) instead of
+        being buffered and decoded in full, which keeps memory flat for long
+        1-hour ranges across many sites. Consume the iterator fully or close
+        it to release the connection.
+
+        Args:
+            type: Specifies whether metrics are returned using 5m or 1h intervals
+            begin_timestamp: The earliest timestamp to retrieve data from (RFC3339 format)
+            end_timestamp: The latest timestamp to retrieve data up to (RFC3339 format)
+            duration: Specifies the time range of metrics to retrieve (24h, 7d or 30d)
+
+        Yields:
+            Entries of the "data" list of the response
+
+        Raises:
+            UniFiApiError: If the API request fails
+            ValueError: If parameters are invalid
+        """
+        params = self._isp_metrics_params(type, begin_timestamp, end_timestamp, duration)
+        return self._iter_stream("GET", _ISP_METRICS_ENDPOINTS[type], params=params)
 
     def close(self) -> None:
         """Close the session"""
-        with self._lock:
-            if self._session:
-                self._session.close()
-                self._session = None
-                self._session_created_at = None
+        # Already closed, or never opened: nothing to tear down or lock for
+        if self._session is None:
+            return
+        self._discard_session()
 
-    def __enter__(self):
+    def __enter__(self) -> "UniFiApiClient":
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
+    def __exit__(self, exc_type: Any, exc_val: Any, exc_tb: Any) -> None:
         self.close()
-
-    def __del__(self):
-        self.close()
\ No newline at end of file
@@ -0,0 +1,301 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+httpx = pytest.importorskip("httpx")
+
+from unifi_client.async_unifi import AsyncUniFiApiClient  # noqa: E402
+from unifi_client.unifi import UniFiApiError  # noqa: E402
+
+
+def _client_with_handler(handler, **kwargs):
+    """Build an async client whose requests are served by handler"""
+    client = AsyncUniFiApiClient(api_key="test-key", **kwargs)
+
+    def create_client():
+        return httpx.AsyncClient(
+            transport=httpx.MockTransport(handler),
+            headers={"X-API-Key": client.api_key},
+        )
+
+    client._create_client = create_client
+    return client
+
+
+class TestAsyncClientInit:
+    """Test async client initialization"""
+
+    def test_init_with_valid_api_key(self):
+        client = AsyncUniFiApiClient(api_key="test-api-key")
+        assert client.api_key == "test-api-key"
+        assert client.base_url == "https://api.ui.com/v1"
+        assert client.max_connections == 50
+
+    def test_init_with_empty_api_key_raises_error(self):
+        with pytest.raises(ValueError, match="API key cannot be empty"):
+            AsyncUniFiApiClient(api_key="")
+
+
+class TestAsyncMakeRequest:
+    """Test async request handling"""
+
+    def test_list_hosts_success(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            return httpx.Response(200, json={"data": [{"id": "host1"}]})
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                return await client.list_hosts(page_size=20)
+
+        result = asyncio.run(run())
+
+        assert result == {"data": [{"id": "host1"}]}
+        assert seen[0].url.path == "/v1/hosts"
+        assert seen[0].url.params["pageSize"] == "20"
+        assert seen[0].headers["X-API-Key"] == "test-key"
+
+    def test_gather_shares_one_client(self):
+        def handler(request):
+            return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                create_client = client._create_client
+                with patch.object(client, '_create_client', wraps=create_client) as create:
+                    results = await asyncio.gather(
+                        *(client.get_host_by_id(f"host{i}") for i in range(5))
+                    )
+                return results, create.call_count
+
+        results, created = asyncio.run(run())
+
+        assert [r["id"] for r in results] == [f"host{i}" for i in range(5)]
+        assert created == 1
+
+    def test_expired_client_is_renewed_in_place(self):
+        def handler(request):
+            return httpx.Response(200, json={"data": []})
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                first = await client._get_client()
+                first.cookies.set("stale", "1")
+                client._client_renewed_at -= client._session_ttl_seconds + 60
+                second = await client._get_client()
+                return first, second
+
+        first, second = asyncio.run(run())
+
+        assert first is second
+        assert not second.cookies
+
+    def test_retries_once_on_401(self):
+        responses = [httpx.Response(401, text="Unauthorized"), httpx.Response(200, json={"data": []})]
+
+        def handler(request):
+            return responses.pop(0)
+
+        async def run():
+            client = _client_with_handler(handler)
+            await client._get_client()
+            client._client_created_at -= 60
+            with patch.object(client, 'refresh_session', wraps=client.refresh_session) as refresh:
+                result = await client.list_sites()
+            await client.close()
+            return result, refresh.call_count
+
+        result, refresh_calls = asyncio.run(run())
+
+        assert result == {"data": []}
+        assert refresh_calls == 1
+
+    def test_staggered_401s_from_stale_client_all_retry(self):
+        created = []
+
+        async def handler(request):
+            if request.headers["X-Generation"] == "1":
+                # The stale client's failures arrive one after another
+                await asyncio.sleep(0.01 * int(request.url.path[-1]))
+                return httpx.Response(401, text="Unauthorized")
+            return httpx.Response(200, json={"id": request.url.path.rsplit("/", 1)[-1]})
+
+        client = AsyncUniFiApiClient(api_key="test-key")
+
+        def create_client():
+            created.append(None)
+            return httpx.AsyncClient(
+                transport=httpx.MockTransport(handler),
+                headers={"X-Generation": str(len(created))},
+            )
+
+        client._create_client = create_client
+
+        async def run():
+            await client._get_client()
+            client._client_created_at -= 60
+            results = await asyncio.gather(
+                *(client.get_host_by_id(f"host{i}") for i in range(5)),
+                return_exceptions=True
+            )
+            await client.close()
+            return results
+
+        results = asyncio.run(run())
+
+        assert results == [{"id": f"host{i}"} for i in range(5)]
+        assert len(created) == 2
+
+    def test_401_does_not_close_requests_in_flight(self):
+        transports = []
+
+        class ClosableTransport(httpx.AsyncBaseTransport):
+            """Fails requests still waiting on a response when closed"""
+
+            def __init__(self, generation):
+                self.generation = generation
+                self.closed = False
+
+            async def handle_async_request(self, request):
+                if request.url.path.endswith("/hosts"):
+                    await asyncio.sleep(0.05)
+                    response = httpx.Response(200, json={"data": []})
+                elif self.generation == 1:
+                    response = httpx.Response(401, text="Unauthorized")
+                else:
+                    response = httpx.Response(200, json={"id": "host1"})
+                if self.closed:
+                    raise httpx.ReadError("connection closed", request=request)
+                return response
+
+            async def aclose(self):
+                self.closed = True
+
+        client = AsyncUniFiApiClient(api_key="test-key")
+
+        def create_client():
+            transports.append(ClosableTransport(len(transports) + 1))
+            return httpx.AsyncClient(transport=transports[-1])
+
+        client._create_client = create_client
+
+        async def run():
+            await client._get_client()
+            client._client_created_at -= 60
+            results = await asyncio.gather(
+                client.list_hosts(),
+                client.list_hosts(),
+                client.get_host_by_id("host1"),
+                return_exceptions=True
+            )
+            stale_closed = transports[0].closed
+            await client.close()
+            return results, stale_closed
+
+        results, stale_closed = asyncio.run(run())
+
+        assert results == [{"data": []}, {"data": []}, {"id": "host1"}]
+        assert len(transports) == 2
+        assert stale_closed
+
+    def test_fresh_client_fails_fast_on_401(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(401, text="Unauthorized")
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                await client.list_sites()
+
+        with pytest.raises(UniFiApiError, match="API request failed: 401"):
+            asyncio.run(run())
+        assert len(calls) == 1
+
+    def test_http_error_raises_unified_error(self):
+        def handler(request):
+            return httpx.Response(500, text="Internal Server Error")
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                await client.list_sd_wan_configs()
+
+        with pytest.raises(UniFiApiError, match="API request failed: 500"):
+            asyncio.run(run())
+
+    def test_timeout_raises_error(self):
+        def handler(request):
+            raise httpx.ReadTimeout("timed out", request=request)
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                await client.list_hosts()
+
+        with pytest.raises(UniFiApiError, match="timed out"):
+            asyncio.run(run())
+
+    def test_empty_body_returns_empty_dict(self):
+        def handler(request):
+            return httpx.Response(204)
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                return await client.list_sites()
+
+        assert asyncio.run(run()) == {}
+
+    def test_not_modified_returns_cached_body(self):
+        seen = []
+
+        def handler(request):
+            seen.append(request)
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return httpx.Response(200, json={"data": []}, headers={"ETag": '"v1"'})
+
+        async def run():
+            async with _client_with_handler(handler) as client:
+                return await client.list_hosts(), await client.list_hosts()
+
+        first, second = asyncio.run(run())
+
+        assert second == first
+        assert second is not first
+        assert len(seen) == 2
+
+    def test_validation_errors_raise_before_awaiting(self):
+        client = AsyncUniFiApiClient(api_key="test-key")
+        with pytest.raises(ValueError, match="page_size must be between 1 and 100"):
+            client.list_hosts(page_size=0)
+
+
+class TestAsyncIterPages:
+    """Test async pagination iterators"""
+
+    @pytest.mark.parametrize("prefetch", [False, True])
+    def test_iter_hosts_follows_next_token(self, prefetch):
+        pages = {
+            None: {"data": [{"id": "h1"}, {"id": "h2"}], "nextToken": "t2"},
+            "t2": {"data": [{"id": "h3"}]},
+        }
+        seen = []
+
+        def handler(request):
+            token = request.url.params.get("nextToken")
+            seen.append(token)
+            return httpx.Response(200, json=pages[token])
+
+        async def run():
+            async with _client_with_handler(handler, etag_cache_size=0) as client:
+                return [h["id"] async for h in client.iter_hosts(prefetch=prefetch)]
+
+        assert asyncio.run(run()) == ["h1", "h2", "h3"]
+        assert seen == [None, "t2"]
+
+    def test_iter_devices_validates_eagerly(self):
+        client = AsyncUniFiApiClient(api_key="test-key")
+        with pytest.raises(ValueError, match="Invalid RFC3339"):
+            client.iter_devices(time="not-a-time")
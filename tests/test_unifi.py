@@ -1,8 +1,59 @@
+import gc
+import io
+import json
 import pytest
-from unittest.mock import Mock, patch
-from datetime import datetime, timedelta
+import threading
+from unittest.mock import MagicMock, Mock, patch
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from types import SimpleNamespace
 import requests
-from unifi_client.unifi import UniFiApiClient, UniFiApiError
+from urllib3.util.retry import RequestHistory
+from unifi_client.unifi import (
+    UniFiApiClient,
+    UniFiApiError,
+    _ETagCache,
+    _JitteredRetry,
+    _UniFiEndpoints,
+    _parse_rfc3339,
+)
+
+
+# Transport errors shared by the request tests; the client only reads them
+_HTTP_ERROR_401 = requests.HTTPError(
+    response=SimpleNamespace(status_code=401, content=b"Unauthorized")
+)
+_HTTP_ERROR_500 = requests.HTTPError(
+    response=SimpleNamespace(status_code=500, content=b"Internal Server Error")
+)
+_TIMEOUT_ERROR = requests.Timeout()
+
+
+def _json_response(body, status_code=200, headers=None):
+    """Build a fake successful response carrying a JSON body"""
+    return SimpleNamespace(
+        status_code=status_code,
+        headers=headers or {},
+        content=json.dumps(body).encode(),
+        raise_for_status=lambda: None,
+    )
+
+
+@pytest.fixture
+def mock_request(monkeypatch):
+    """Replace Session.request for the duration of a test"""
+    mock = MagicMock()
+    monkeypatch.setattr(requests.Session, "request", mock)
+    return mock
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Client shared by tests that neither configure nor mutate it"""
+    # No ETag cache, so one test's responses never answer another's requests
+    c = UniFiApiClient(api_key="test-key", etag_cache_size=0)
+    yield c
+    c.close()
 
 
 class TestUniFiApiClientInit:
@@ -14,6 +65,7 @@ class TestUniFiApiClientInit:
         assert client.api_version == "v1"
         assert client.base_url == "https://api.ui.com/v1"
         assert client.timeout == 30
+        assert client.pool_maxsize == 50
 
     def test_init_with_custom_params(self):
         client = UniFiApiClient(
@@ -26,6 +78,20 @@ class TestUniFiApiClientInit:
         assert client.timeout == 60
         assert client.session_ttl == timedelta(minutes=30)
 
+    def test_endpoints_subclass_must_implement_transport(self):
+        class Incomplete(_UniFiEndpoints):
+            def _make_request(self, method, endpoint, params=None, cacheable=False, **kwargs):
+                return {}
+
+        with pytest.raises(TypeError, match="_iter_pages"):
+            Incomplete()
+
+    def test_init_uses_slots(self):
+        client = UniFiApiClient(api_key="test-key")
+        assert not hasattr(client, "__dict__")
+        with pytest.raises(AttributeError):
+            client.unknown_attribute = 1
+
     def test_init_with_empty_api_key_raises_error(self):
         with pytest.raises(ValueError, match="API key cannot be empty"):
             UniFiApiClient(api_key="")
@@ -45,6 +111,62 @@ class TestSessionManagement:
         assert isinstance(session, requests.Session)
         assert session.headers["X-API-Key"] == "test-key"
         assert session.headers["Accept"] == "application/json"
+        assert session.headers["Connection"] == "keep-alive"
+        assert "gzip" in session.headers["Accept-Encoding"]
+
+    def test_session_adapter_retries_transient_errors(self):
+        client = UniFiApiClient(api_key="test-key", pool_maxsize=8)
+        adapter = client.session.get_adapter("https://api.ui.com")
+        assert adapter._pool_maxsize == 8
+        assert adapter._pool_connections == 1
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
+        assert adapter.max_retries.allowed_methods == {"GET", "POST"}
+        assert adapter.max_retries.respect_retry_after_header
+
+    def test_session_adapter_honours_max_retries(self):
+        client = UniFiApiClient(api_key="test-key", max_retries=5)
+        adapter = client.session.get_adapter("https://api.ui.com")
+        assert isinstance(adapter.max_retries, _JitteredRetry)
+        assert adapter.max_retries.total == 5
+
+    @pytest.mark.parametrize("errors,jitter,expected", [
+        (1, 1.0, 0),
+        (2, 0.0, 2.0),
+        (3, 1.0, 6.0),
+        (10, 1.0, 30.0),
+    ])
+    def test_retry_backoff_is_jittered_and_capped(self, errors, jitter, expected):
+        history = (RequestHistory("GET", "/hosts", None, 503, None),) * errors
+        retry = _JitteredRetry(total=10, backoff_factor=1.0, history=history)
+        with patch("unifi_client.unifi.random.random", return_value=jitter):
+            assert retry.get_backoff_time() == expected
+
+    @pytest.mark.parametrize("method,status,expected", [
+        ("GET", 502, True),
+        ("POST", 502, False),
+        ("POST", 503, True),
+        ("POST", 429, True),
+    ])
+    def test_retry_skips_502_for_post(self, method, status, expected):
+        retry = _JitteredRetry(
+            total=3,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"])
+        )
+        assert retry.is_retry(method, status) is expected
+
+    def test_session_ttl_assignment_applies(self):
+        client = UniFiApiClient(api_key="test-key")
+        session1 = client.session
+        session1.cookies.set("stale", "1")
+
+        client.session_ttl = timedelta(0)
+        client._session_renewed_at -= 1
+
+        assert client._session_ttl_seconds == 0
+        assert client.session is session1
+        assert not session1.cookies
 
     def test_session_reuses_existing_session(self):
         client = UniFiApiClient(api_key="test-key")
@@ -52,13 +174,29 @@ class TestSessionManagement:
         session2 = client.session
         assert session1 is session2
 
-    def test_session_refreshes_after_ttl(self):
+    def test_session_fast_path_skips_lock(self):
+        client = UniFiApiClient(api_key="test-key")
+        session1 = client.session
+        client._lock = MagicMock()
+
+        session2 = client.session
+
+        assert session1 is session2
+        client._lock.__enter__.assert_not_called()
+
+    def test_session_renewed_in_place_after_ttl(self):
         client = UniFiApiClient(api_key="test-key", session_ttl_minutes=0)
         session1 = client.session
+        session1.cookies.set("stale", "1")
+        session1.headers["X-API-Key"] = "tampered"
+        session1.close = Mock()
         # Force time to pass
-        client._session_created_at = datetime.now() - timedelta(minutes=1)
+        client._session_renewed_at = monotonic() - 60
         session2 = client.session
-        assert session1 is not session2
+        assert session1 is session2
+        assert not session2.cookies
+        assert session2.headers["X-API-Key"] == "test-key"
+        session1.close.assert_not_called()
 
     def test_refresh_session_closes_old_session(self):
         client = UniFiApiClient(api_key="test-key")
@@ -70,6 +208,18 @@ class TestSessionManagement:
         old_session.close.assert_called_once()
         assert client._session is None
 
+    def test_close_releases_lock_before_closing_session(self):
+        client = UniFiApiClient(api_key="test-key")
+        session = client.session
+        lock_held = []
+        session.close = Mock(side_effect=lambda: lock_held.append(client._lock.locked()))
+
+        client.close()
+        client.session.close = Mock()
+        client.refresh_session()
+
+        assert lock_held == [False]
+
     def test_context_manager_closes_session(self):
         with UniFiApiClient(api_key="test-key") as client:
             session = client.session
@@ -81,57 +231,71 @@ class TestSessionManagement:
 class TestValidation:
     """Test validation helper methods"""
 
-    def test_validate_rfc3339_with_z_suffix(self):
-        client = UniFiApiClient(api_key="test-key")
-        timestamp = "2024-03-15T14:30:45.123Z"
-        result = client._validate_rfc3339(timestamp)
-        assert isinstance(result, datetime)
-        assert result.year == 2024
-        assert result.month == 3
-        assert result.day == 15
-
-    def test_validate_rfc3339_with_timezone_offset(self):
-        client = UniFiApiClient(api_key="test-key")
-        timestamp = "2024-03-15T14:30:45.123+05:30"
-        result = client._validate_rfc3339(timestamp)
-        assert isinstance(result, datetime)
-
-    def test_validate_rfc3339_with_invalid_format_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    @pytest.mark.parametrize("timestamp,expected", [
+        ("2024-03-15T14:30:45.123Z", datetime(2024, 3, 15, 14, 30, 45, 123000, tzinfo=timezone.utc)),
+        ("2025-06-17T02:45:58Z", datetime(2025, 6, 17, 2, 45, 58, tzinfo=timezone.utc)),
+        ("2024-03-15T14:30:45.123+05:30",
+         datetime(2024, 3, 15, 14, 30, 45, 123000, tzinfo=timezone(timedelta(hours=5, minutes=30)))),
+        ("2024-03-15T14:30:45.1Z", datetime(2024, 3, 15, 14, 30, 45, 100000, tzinfo=timezone.utc)),
+        ("2024-03-15T14:30:45.12Z", datetime(2024, 3, 15, 14, 30, 45, 120000, tzinfo=timezone.utc)),
+        ("2024-03-15T14:30:45.1234Z", datetime(2024, 3, 15, 14, 30, 45, 123400, tzinfo=timezone.utc)),
+        ("2024-03-15T14:30:45.123456789Z", datetime(2024, 3, 15, 14, 30, 45, 123456, tzinfo=timezone.utc)),
+    ])
+    def test_validate_rfc3339_valid(self, client, timestamp, expected):
+        assert client._validate_rfc3339(timestamp) == expected
+
+    @pytest.mark.parametrize("timestamp", [
+        "2024-03-15",
+        "2024-03-15T14:30:45.123",
+        "2024-03-15 14:30:45Z",
+        "20240315T143045Z",
+        "2024-13-15T14:30:45Z",
+        "2024-03-32T14:30:45.1Z",
+        "2024-03-15T25:30:45.123456789+01:00",
+        "2024-03-15T14:30:45.Z",
+    ])
+    def test_validate_rfc3339_invalid_raises_error(self, client, timestamp):
         with pytest.raises(ValueError, match="Invalid RFC3339 timestamp format"):
-            client._validate_rfc3339("2024-03-15")
-
-    def test_validate_timestamp_range_valid(self):
-        client = UniFiApiClient(api_key="test-key")
-        begin = "2024-03-15T10:00:00.000Z"
-        end = "2024-03-15T14:00:00.000Z"
+            client._validate_rfc3339(timestamp)
+
+    @pytest.mark.parametrize("begin,end", [
+        ("2024-03-15T10:00:00.000Z", "2024-03-15T14:00:00.000Z"),
+        ("2024-03-15T10:00:00.000Z", None),
+        (None, "2024-03-15T14:00:00.000Z"),
+        (None, None),
+    ])
+    def test_validate_timestamp_range_valid(self, client, begin, end):
         # Should not raise
         client._validate_timestamp_range(begin, end)
 
-    def test_validate_timestamp_range_invalid_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
-        begin = "2024-03-15T14:00:00.000Z"
-        end = "2024-03-15T10:00:00.000Z"
+    @pytest.mark.parametrize("begin,end", [
+        ("2024-03-15T14:00:00.000Z", "2024-03-15T10:00:00.000Z"),
+        ("2024-03-15T10:00:00.000Z", "2024-03-15T10:00:00.000Z"),
+        # 14:00+05:30 is 08:30Z, before the 10:00Z start
+        ("2024-03-15T10:00:00.000Z", "2024-03-15T14:00:00.000+05:30"),
+    ])
+    def test_validate_timestamp_range_invalid_raises_error(self, client, begin, end):
         with pytest.raises(ValueError, match="must be strictly greater"):
             client._validate_timestamp_range(begin, end)
 
-    def test_validate_timestamp_range_with_none_values(self):
-        client = UniFiApiClient(api_key="test-key")
-        # Should not raise
-        client._validate_timestamp_range(None, None)
-        client._validate_timestamp_range("2024-03-15T10:00:00.000Z", None)
-        client._validate_timestamp_range(None, "2024-03-15T14:00:00.000Z")
+    def test_validate_timestamp_range_reuses_parsed_timestamps(self, client):
+        _parse_rfc3339.cache_clear()
+        begin = "2024-03-15T10:00:00Z"
+        end = "2024-03-15T14:00:00Z"
+
+        client._validate_timestamp_range(begin, end)
+        client._validate_timestamp_range(begin, end)
+
+        info = _parse_rfc3339.cache_info()
+        assert info.misses == 2
+        assert info.hits == 2
 
 
 class TestMakeRequest:
     """Test centralized request handling"""
 
-    @patch('unifi_client.unifi.requests.Session.request')
     def test_make_request_success(self, mock_request):
-        mock_response = Mock()
-        mock_response.json.return_value = {"data": "test"}
-        mock_response.raise_for_status = Mock()
-        mock_request.return_value = mock_response
+        mock_request.return_value = _json_response({"data": "test"})
 
         client = UniFiApiClient(api_key="test-key")
         result = client._make_request("GET", "hosts")
@@ -139,111 +303,265 @@ class TestMakeRequest:
         assert result == {"data": "test"}
         mock_request.assert_called_once()
 
-    @patch('unifi_client.unifi.requests.Session.request')
     def test_make_request_with_params(self, mock_request):
-        mock_response = Mock()
-        mock_response.json.return_value = {"data": "test"}
-        mock_response.raise_for_status = Mock()
-        mock_request.return_value = mock_response
+        mock_request.return_value = _json_response({"data": "test"})
 
         client = UniFiApiClient(api_key="test-key")
-        params = {"pageSize": "10"}
+        params = {"pageSize": 10}
         client._make_request("GET", "hosts", params=params)
 
         call_args = mock_request.call_args
         assert call_args.kwargs["params"] == params
 
-    @patch('unifi_client.unifi.requests.Session.request')
+    @pytest.mark.parametrize("endpoint,url", [
+        ("hosts", "https://api.ui.com/v1/hosts"),
+        ("hosts/host123", "https://api.ui.com/v1/hosts/host123"),
+        ("ea/isp-metrics/5m", "https://api.ui.com/ea/isp-metrics/5m"),
+        ("ea/sd-wan-configs", "https://api.ui.com/ea/sd-wan-configs"),
+    ])
+    def test_make_request_builds_url(self, mock_request, endpoint, url):
+        mock_request.return_value = _json_response({"data": []})
+
+        client = UniFiApiClient(api_key="test-key")
+        client._make_request("GET", endpoint)
+
+        assert mock_request.call_args.kwargs["url"] == url
+
     def test_make_request_retries_on_401(self, mock_request):
         # First call returns 401, second call succeeds
-        error_response = Mock()
-        error_response.status_code = 401
-        error_response.text = "Unauthorized"
-        
-        success_response = Mock()
-        success_response.json.return_value = {"data": "test"}
-        success_response.raise_for_status = Mock()
+        success_response = _json_response({"data": "test"})
 
-        mock_request.side_effect = [
-            requests.HTTPError(response=error_response),
-            success_response
-        ]
+        mock_request.side_effect = [_HTTP_ERROR_401, success_response]
 
         client = UniFiApiClient(api_key="test-key")
-        with patch.object(client, 'refresh_session'):
-            result = client._make_request("GET", "hosts")
-        
+        stale = client.session
+        client._session_created_at = monotonic() - 60
+        result = client._make_request("GET", "hosts")
+
         assert result == {"data": "test"}
         assert mock_request.call_count == 2
+        assert client._session is not stale
+
+    def test_make_request_retries_401_from_already_replaced_session(self, mock_request):
+        client = UniFiApiClient(api_key="test-key")
+        client.session
+        client._session_created_at = monotonic() - 60
+        replacement = []
+
+        def replaced_then_401(**kwargs):
+            # Another caller refreshes while this request is in flight
+            client.refresh_session()
+            replacement.append(client.session)
+            raise _HTTP_ERROR_401
+
+        attempts = iter([replaced_then_401, lambda **kwargs: _json_response({"data": "test"})])
+        mock_request.side_effect = lambda **kwargs: next(attempts)(**kwargs)
+
+        result = client._make_request("GET", "hosts")
+
+        assert result == {"data": "test"}
+        assert mock_request.call_count == 2
+        # The fresh session is kept, not discarded as if it had failed
+        assert client._session is replacement[0]
+
+    def test_make_request_fresh_session_fails_fast_on_401(self, mock_request):
+        mock_request.side_effect = _HTTP_ERROR_401
+
+        client = UniFiApiClient(api_key="test-key")
+        with patch.object(UniFiApiClient, '_discard_session') as refresh:
+            with pytest.raises(UniFiApiError, match="API request failed: 401"):
+                client._make_request("GET", "hosts")
+
+        refresh.assert_not_called()
+        assert mock_request.call_count == 1
 
-    @patch('unifi_client.unifi.requests.Session.request')
     def test_make_request_timeout_raises_error(self, mock_request):
-        mock_request.side_effect = requests.Timeout()
+        mock_request.side_effect = _TIMEOUT_ERROR
 
         client = UniFiApiClient(api_key="test-key")
         with pytest.raises(UniFiApiError, match="timed out"):
             client._make_request("GET", "hosts")
 
-    @patch('unifi_client.unifi.requests.Session.request')
     def test_make_request_http_error_raises_unified_error(self, mock_request):
-        error_response = Mock()
-        error_response.status_code = 500
-        error_response.text = "Internal Server Error"
-        mock_request.side_effect = requests.HTTPError(response=error_response)
+        mock_request.side_effect = _HTTP_ERROR_500
 
         client = UniFiApiClient(api_key="test-key")
         with pytest.raises(UniFiApiError, match="API request failed: 500"):
             client._make_request("GET", "hosts")
 
-    @patch('unifi_client.unifi.requests.Session.request')
+    def test_make_request_http_error_logs_truncated_body(self, mock_request, caplog):
+        error_response = SimpleNamespace(status_code=500, content=b"x" * 10_000)
+        mock_request.side_effect = requests.HTTPError(response=error_response)
+
+        client = UniFiApiClient(api_key="test-key")
+        with pytest.raises(UniFiApiError):
+            client._make_request("GET", "hosts")
+
+        assert caplog.records[-1].getMessage() == "HTTP error: 500 - " + "x" * 512
+
+    def test_make_request_empty_body_returns_empty_dict(self, mock_request):
+        mock_request.return_value = SimpleNamespace(
+            status_code=204,
+            headers={},
+            content=b"",
+            raise_for_status=lambda: None,
+        )
+
+        client = UniFiApiClient(api_key="test-key")
+        assert client._make_request("GET", "hosts") == {}
+
     def test_make_request_invalid_json_raises_error(self, mock_request):
-        mock_response = Mock()
-        mock_response.raise_for_status = Mock()
-        mock_response.json.side_effect = ValueError("Invalid JSON")
-        mock_request.return_value = mock_response
+        mock_request.return_value = SimpleNamespace(
+            status_code=200,
+            headers={},
+            content=b"not json",
+            raise_for_status=lambda: None,
+        )
 
         client = UniFiApiClient(api_key="test-key")
         with pytest.raises(UniFiApiError, match="Invalid JSON response"):
             client._make_request("GET", "hosts")
 
 
+class TestUniFiApiError:
+    """Test error message rendering"""
+
+    def test_plain_message(self):
+        assert str(UniFiApiError("Invalid JSON response from API")) == "Invalid JSON response from API"
+
+    def test_message_formatted_lazily(self):
+        error = UniFiApiError("API request failed: %s", 500)
+        assert error.args == ("API request failed: %s", 500)
+        assert str(error) == "API request failed: 500"
+
+    @pytest.mark.parametrize("args", [
+        ("Host lookup failed", "host123"),
+        ("Rate limited at 100%", 429),
+        ("Bad format %d", "not-a-number"),
+        (404, "Not Found"),
+    ])
+    def test_non_format_args_render_like_exception(self, args):
+        assert str(UniFiApiError(*args)) == str(Exception(*args))
+
+
+class TestETagCache:
+    """Test conditional GET caching"""
+
+    def test_not_modified_returns_cached_body(self, mock_request):
+        mock_request.side_effect = [
+            _json_response({"data": ["host1"]}, headers={"ETag": '"v1"'}),
+            _json_response(None, status_code=304),
+        ]
+
+        client = UniFiApiClient(api_key="test-key")
+        first = client.list_hosts()
+        first["data"].append("mutated")
+        second = client.list_hosts()
+
+        assert second == {"data": ["host1"]}
+        assert "headers" not in mock_request.call_args_list[0].kwargs
+        assert mock_request.call_args_list[1].kwargs["headers"] == {"If-None-Match": '"v1"'}
+
+    def test_cache_keyed_by_params(self, mock_request):
+        mock_request.return_value = _json_response({"data": []}, headers={"ETag": '"v1"'})
+
+        client = UniFiApiClient(api_key="test-key")
+        client.list_hosts()
+        client.list_hosts(page_size=20)
+
+        assert "headers" not in mock_request.call_args_list[1].kwargs
+
+    def test_no_store_responses_are_not_cached(self, mock_request):
+        mock_request.return_value = _json_response(
+            {"data": []}, headers={"ETag": '"v1"', "Cache-Control": "no-store"}
+        )
+
+        client = UniFiApiClient(api_key="test-key")
+        client.list_hosts()
+        client.list_hosts()
+
+        assert "headers" not in mock_request.call_args_list[1].kwargs
+
+    def test_cache_can_be_disabled(self, mock_request):
+        mock_request.return_value = _json_response({"data": []}, headers={"ETag": '"v1"'})
+
+        client = UniFiApiClient(api_key="test-key", etag_cache_size=0)
+        client.list_hosts()
+        client.list_hosts()
+
+        assert "headers" not in mock_request.call_args_list[1].kwargs
+
+    @pytest.mark.parametrize("fetch", [
+        lambda client: client.list_hosts(next_token="token123"),
+        lambda client: client.list_devices(),
+        lambda client: client.get_isp_metrics(duration="24h"),
+    ])
+    def test_only_lookups_are_cached(self, mock_request, fetch):
+        mock_request.return_value = _json_response({"data": []}, headers={"ETag": '"v1"'})
+
+        client = UniFiApiClient(api_key="test-key")
+        fetch(client)
+        fetch(client)
+
+        assert "headers" not in mock_request.call_args_list[1].kwargs
+        assert not client._etag_cache._entries
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = _ETagCache(maxsize=2)
+        cache.put("a", {"ETag": "1"}, b"{}")
+        cache.put("b", {"ETag": "2"}, b"{}")
+        cache.get("a")
+        cache.put("c", {"ETag": "3"}, b"{}")
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+
 class TestListHosts:
     """Test list_hosts endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_hosts_default_params(self, mock_request):
+    def test_list_hosts_default_params(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.list_hosts()
 
         mock_request.assert_called_once_with(
-            "GET", "hosts", params={"pageSize": "10"}
+            "GET", "hosts", params={"pageSize": 10}, cacheable=True
         )
         assert result == {"data": []}
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_hosts_with_custom_page_size(self, mock_request):
+    def test_list_hosts_with_custom_page_size(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         client.list_hosts(page_size=50)
 
         call_args = mock_request.call_args
-        assert call_args[1]["params"]["pageSize"] == "50"
+        assert call_args[1]["params"]["pageSize"] == 50
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_hosts_with_next_token(self, mock_request):
+    def test_list_hosts_with_next_token(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         client.list_hosts(next_token="token123")
 
         call_args = mock_request.call_args
         assert call_args[1]["params"]["nextToken"] == "token123"
+        assert call_args[1]["cacheable"] is False
 
-    def test_list_hosts_invalid_page_size_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    def test_list_hosts_default_params_are_shared(self, mock_request, client):
+        mock_request.return_value = _json_response({"data": []})
+
+        client.list_hosts()
+        client.list_hosts()
+
+        first, second = mock_request.call_args_list
+        assert first.kwargs["params"] is second.kwargs["params"]
+        assert first.kwargs["params"] == {"pageSize": 10}
+
+    def test_list_hosts_invalid_page_size_raises_error(self, client):
         with pytest.raises(ValueError, match="page_size must be between 1 and 100"):
             client.list_hosts(page_size=101)
 
@@ -255,17 +573,15 @@ class TestGetHostById:
     """Test get_host_by_id endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_get_host_by_id_success(self, mock_request):
+    def test_get_host_by_id_success(self, mock_request, client):
         mock_request.return_value = {"id": "host123", "name": "Test Host"}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.get_host_by_id("host123")
 
-        mock_request.assert_called_once_with("GET", "hosts/host123")
+        mock_request.assert_called_once_with("GET", "hosts/host123", cacheable=True)
         assert result["id"] == "host123"
 
-    def test_get_host_by_id_empty_id_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    def test_get_host_by_id_empty_id_raises_error(self, client):
         with pytest.raises(ValueError, match="host_id cannot be empty"):
             client.get_host_by_id("")
 
@@ -274,14 +590,13 @@ class TestListSites:
     """Test list_sites endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_sites_success(self, mock_request):
+    def test_list_sites_success(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.list_sites()
 
         mock_request.assert_called_once_with(
-            "GET", "sites", params={"pageSize": "10"}
+            "GET", "sites", params={"pageSize": 10}, cacheable=True
         )
 
 
@@ -289,10 +604,9 @@ class TestListDevices:
     """Test list_devices endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_devices_with_time_filter(self, mock_request):
+    def test_list_devices_with_time_filter(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         timestamp = "2024-03-15T14:30:45.123Z"
         client.list_devices(time=timestamp)
 
@@ -300,39 +614,111 @@ class TestListDevices:
         assert call_args[1]["params"]["time"] == timestamp
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_devices_with_host_ids(self, mock_request):
+    def test_list_devices_with_host_ids(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         client.list_devices(host_ids=["host1", "host2"])
 
         call_args = mock_request.call_args
         assert call_args[1]["params"]["hostIds"] == "host1,host2"
 
-    def test_list_devices_with_invalid_time_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    @patch.object(UniFiApiClient, '_make_request')
+    def test_list_devices_reuses_joined_host_ids(self, mock_request, client):
+        client.list_devices(host_ids=["host1", "host2"])
+        first = mock_request.call_args.kwargs["params"]["hostIds"]
+        client.list_devices(host_ids=["host1", "host2"])
+        second = mock_request.call_args.kwargs["params"]["hostIds"]
+
+        assert second is first
+
+    def test_list_devices_with_invalid_time_raises_error(self, client):
         with pytest.raises(ValueError, match="Invalid RFC3339 timestamp"):
             client.list_devices(time="invalid-timestamp")
 
 
+class TestIterPages:
+    """Test pagination iterators"""
+
+    PAGES = [
+        {"data": [{"id": "a"}, {"id": "b"}], "nextToken": "t1"},
+        {"data": [{"id": "c"}], "nextToken": "t2"},
+        {"data": [{"id": "d"}]},
+    ]
+
+    @pytest.mark.parametrize("prefetch", [False, True])
+    @patch.object(UniFiApiClient, '_make_request')
+    def test_iter_hosts_follows_next_token(self, mock_request, prefetch, client):
+        mock_request.side_effect = self.PAGES
+
+        result = [host["id"] for host in client.iter_hosts(prefetch=prefetch)]
+
+        assert result == ["a", "b", "c", "d"]
+        tokens = [c[1]["params"].get("nextToken") for c in mock_request.call_args_list]
+        assert tokens == [None, "t1", "t2"]
+
+    @patch.object(UniFiApiClient, '_make_request')
+    def test_abandoned_prefetch_is_not_awaited(self, mock_request, client):
+        release = threading.Event()
+
+        def fetch(method, endpoint, params=None, cacheable=False):
+            if params.get("nextToken"):
+                release.wait(5)
+            return self.PAGES[0]
+
+        mock_request.side_effect = fetch
+
+        pages = client.iter_hosts(prefetch=True)
+        started = monotonic()
+        host = next(pages)
+        pages.close()
+        elapsed = monotonic() - started
+        release.set()
+
+        assert host == {"id": "a"}
+        assert elapsed < 1
+
+    @patch.object(UniFiApiClient, '_make_request')
+    def test_iter_sites_single_page(self, mock_request, client):
+        mock_request.return_value = {"data": [{"siteId": "s1"}]}
+
+        result = list(client.iter_sites(page_size=50))
+
+        assert result == [{"siteId": "s1"}]
+        mock_request.assert_called_once_with(
+            "GET", "sites", params={"pageSize": 50}, cacheable=True
+        )
+
+    @patch.object(UniFiApiClient, '_make_request')
+    def test_iter_devices_passes_filters(self, mock_request, client):
+        mock_request.side_effect = self.PAGES
+
+        result = list(client.iter_devices(host_ids=["host1"], prefetch=True))
+
+        assert len(result) == 4
+        for call in mock_request.call_args_list:
+            assert call[1]["params"]["hostIds"] == "host1"
+
+    def test_iter_hosts_invalid_page_size_raises_error(self, client):
+        with pytest.raises(ValueError, match="page_size must be between 1 and 100"):
+            client.iter_hosts(page_size=0)
+
+
 class TestGetIspMetrics:
     """Test get_isp_metrics endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_get_isp_metrics_with_duration(self, mock_request):
+    def test_get_isp_metrics_with_duration(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         client.get_isp_metrics(type="5m", duration="24h")
 
         call_args = mock_request.call_args
         assert call_args[1]["params"]["duration"] == "24h"
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_get_isp_metrics_with_timestamps(self, mock_request):
+    def test_get_isp_metrics_with_timestamps(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         begin = "2024-03-15T10:00:00.000Z"
         end = "2024-03-15T14:00:00.000Z"
         client.get_isp_metrics(begin_timestamp=begin, end_timestamp=end)
@@ -341,13 +727,11 @@ class TestGetIspMetrics:
         assert call_args[1]["params"]["beginTimestamp"] == begin
         assert call_args[1]["params"]["endTimestamp"] == end
 
-    def test_get_isp_metrics_invalid_type_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    def test_get_isp_metrics_invalid_type_raises_error(self, client):
         with pytest.raises(ValueError, match="must be either '5m' or '1h'"):
             client.get_isp_metrics(type="10m")
 
-    def test_get_isp_metrics_duration_with_timestamps_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    def test_get_isp_metrics_duration_with_timestamps_raises_error(self, client):
         with pytest.raises(ValueError, match="cannot be used with"):
             client.get_isp_metrics(
                 duration="24h",
@@ -355,14 +739,61 @@ class TestGetIspMetrics:
             )
 
 
+def _stream_response(raw_body, status_code=200):
+    """Build a real requests.Response whose body is read from raw_body"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.raw = io.BytesIO(raw_body)
+    return response
+
+
+class TestIterIspMetrics:
+    """Test streamed iter_isp_metrics endpoint"""
+
+    def test_iter_isp_metrics_yields_entries(self, mock_request, client):
+        body = {"data": [{"siteId": "s1", "periods": []}, {"siteId": "s2", "periods": []}]}
+        mock_request.return_value = _stream_response(json.dumps(body).encode())
+
+        result = list(client.iter_isp_metrics(type="1h", duration="7d"))
+
+        assert [entry["siteId"] for entry in result] == ["s1", "s2"]
+        call_args = mock_request.call_args
+        assert call_args.kwargs["url"] == "https://api.ui.com/ea/isp-metrics/1h"
+        assert call_args.kwargs["params"] == {"duration": "7d"}
+        assert call_args.kwargs["stream"] is True
+
+    @patch('unifi_client.unifi.ijson', None)
+    def test_iter_isp_metrics_without_ijson(self, mock_request, client):
+        mock_request.return_value = _stream_response(b'{"data": [{"siteId": "s1"}]}')
+
+        result = list(client.iter_isp_metrics())
+
+        assert result == [{"siteId": "s1"}]
+
+    def test_iter_isp_metrics_invalid_json_raises_error(self, mock_request, client):
+        mock_request.return_value = _stream_response(b'{"data": [{"siteId": ')
+
+        with pytest.raises(UniFiApiError, match="Invalid JSON response"):
+            list(client.iter_isp_metrics())
+
+    def test_iter_isp_metrics_http_error_raises_unified_error(self, mock_request, client):
+        mock_request.return_value = _stream_response(b"", status_code=500)
+
+        with pytest.raises(UniFiApiError, match="API request failed: 500"):
+            list(client.iter_isp_metrics())
+
+    def test_iter_isp_metrics_validates_eagerly(self, client):
+        with pytest.raises(ValueError, match="must be either '5m' or '1h'"):
+            client.iter_isp_metrics(type="10m")
+
+
 class TestQueryIspMetrics:
     """Test query_isp_metrics endpoint"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_query_isp_metrics_with_filters(self, mock_request):
+    def test_query_isp_metrics_with_filters(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         client.query_isp_metrics(
             type="5m",
             site_ids=["site1", "site2"],
@@ -379,33 +810,29 @@ class TestSdWanMethods:
     """Test SD-WAN related endpoints"""
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_list_sd_wan_configs(self, mock_request):
+    def test_list_sd_wan_configs(self, mock_request, client):
         mock_request.return_value = {"data": []}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.list_sd_wan_configs()
 
         mock_request.assert_called_once_with("GET", "ea/sd-wan-configs")
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_get_sd_wan_config_by_id(self, mock_request):
+    def test_get_sd_wan_config_by_id(self, mock_request, client):
         mock_request.return_value = {"id": "config123"}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.get_sd_wan_config_by_id("config123")
 
         mock_request.assert_called_once_with("GET", "ea/sd-wan-configs/config123")
 
-    def test_get_sd_wan_config_by_id_empty_raises_error(self):
-        client = UniFiApiClient(api_key="test-key")
+    def test_get_sd_wan_config_by_id_empty_raises_error(self, client):
         with pytest.raises(ValueError, match="config_id cannot be empty"):
             client.get_sd_wan_config_by_id("")
 
     @patch.object(UniFiApiClient, '_make_request')
-    def test_get_sd_wan_config_status(self, mock_request):
+    def test_get_sd_wan_config_status(self, mock_request, client):
         mock_request.return_value = {"status": "active"}
         
-        client = UniFiApiClient(api_key="test-key")
         result = client.get_sd_wan_config_status("config123")
 
         mock_request.assert_called_once_with("GET", "ea/sd-wan-configs/config123/status")
@@ -424,11 +851,55 @@ class TestCleanup:
         session.close.assert_called_once()
         assert client._session is None
 
-    def test_del_closes_session(self):
+    def test_close_is_idempotent(self):
         client = UniFiApiClient(api_key="test-key")
         session = client.session
         session.close = Mock()
-        
+        client._lock = MagicMock()
+
+        client.close()
+        client.close()
+
+        session.close.assert_called_once()
+        assert client._lock.__enter__.call_count == 1
+
+    def test_close_detaches_finalizer(self):
+        client = UniFiApiClient(api_key="test-key")
+        client.session
+        finalizer = client._finalizer
+
+        client.close()
+
+        assert not finalizer.alive
+
+    def test_shared_pool_reused(self):
+        client1 = UniFiApiClient(api_key="test-key", shared_pool=True)
+        client2 = UniFiApiClient(api_key="other-key", shared_pool=True)
+        private = UniFiApiClient(api_key="test-key")
+
+        adapter = client1.session.get_adapter("https://")
+        assert client2.session.get_adapter("https://") is adapter
+        assert private.session.get_adapter("https://") is not adapter
+        assert client1.session is not client2.session
+        assert client2.session.headers["X-API-Key"] == "other-key"
+
+    def test_close_leaves_shared_pool_open(self):
+        client = UniFiApiClient(api_key="test-key", shared_pool=True)
+        adapter = client.session.get_adapter("https://")
+
+        with patch.object(adapter, 'close') as close_adapter:
+            client.close()
+            close_adapter.assert_not_called()
+
+            UniFiApiClient.close_shared_pool()
+            close_adapter.assert_called_once()
+
+    def test_unreferenced_client_closes_session(self):
+        client = UniFiApiClient(api_key="test-key")
+        session = client.session
+        session.close = Mock()
+
         del client
-        
-        session.close.assert_called()
+        gc.collect()
+
+        session.close.assert_called_once()